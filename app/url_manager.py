@@ -4,18 +4,27 @@ URL Manager - Flask application for managing product URLs
 """
 
 import os
-import asyncio
+import hmac
+import time
+import hashlib
 import threading
-from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
 from typing import List, Dict, Any
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-from pymongo import MongoClient
+import orjson
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
+from flask.json.provider import JSONProvider
+from pymongo import MongoClient, UpdateOne
 from bson import ObjectId
 from werkzeug.middleware.proxy_fix import ProxyFix
+from waitress import serve
 
 from dotenv import load_dotenv
 
+from scrape_price import run as run_scrape
+
 # Load environment variables
 load_dotenv()
 
@@ -23,20 +32,71 @@ load_dotenv()
 MONGO_URL = os.getenv('MONGODB_URL', 'mongodb://localhost:27017/')
 DB_NAME = os.getenv('MONGODB_DB_NAME', 'scrapper')
 URL_COLLECTION_NAME = 'urls'
+META_COLLECTION_NAME = 'meta'
+
+# Connection pool sized for the admin UI plus scraper polling
+MONGO_CLIENT_OPTIONS = {
+    'maxPoolSize': 20,
+    'minPoolSize': 2,
+    'serverSelectionTimeoutMS': 2000,
+    'socketTimeoutMS': 5000,
+    'connect': False,
+    'compressors': os.getenv('MONGODB_COMPRESSORS', 'zlib')
+}
 PORT = int(os.getenv('PORT', 3000))
+SERVER_THREADS = int(os.getenv('SERVER_THREADS', 16))
+DEBUG = os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes')
+URLS_CACHE_TTL = int(os.getenv('URLS_CACHE_TTL', 30))  # seconds
+URLS_BATCH_SIZE = 500
+UPSERT_BATCH_WINDOW = 0.02  # seconds
+UPSERT_WAIT_TIMEOUT = 5  # seconds
+
+# Fields rendered by the admin frontend, with _id converted to a string server-side
+URL_DATA_PIPELINE = [
+    {'$project': {'url': 1, 'name': 1, 'createdAt': 1, 'updatedAt': 1}},
+    {'$addFields': {'_id': {'$toString': '$_id'}}}
+]
 
 # Admin credentials
 ADMIN_USER = os.getenv('ADMIN_USER', 'admin')
 ADMIN_PASS = os.getenv('ADMIN_PASS', 'password')
 
+
+
+def _json_default(obj):
+    """Serialize types orjson doesn't handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dump_json(obj) -> bytes:
+    """Serialize an object to JSON bytes with orjson"""
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NAIVE_UTC)
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return dump_json(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # Create Flask app
 app = Flask(__name__, template_folder='../templates', static_folder='../static')
+TEMPLATE_DIR = os.path.join(app.root_path, app.template_folder)
+app.json = OrjsonProvider(app)
 app.wsgi_app = ProxyFix(app.wsgi_app)
 
 # MongoDB connection
 mongo_client = None
 db = None
 urls_collection = None
+meta_collection = None
+_mongo_lock = threading.Lock()
 
 # Scraper status tracking
 scraper_status = {
@@ -45,14 +105,50 @@ scraper_status = {
     'last_status': None,
     'error': None
 }
+_status_lock = threading.Lock()
+_status_json = orjson.dumps(scraper_status)
+
+# Single warm worker thread for scraper runs
+_scraper_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scraper')
+_scraper_future = None
+_scraper_lock = threading.Lock()
+
+# URL upserts waiting for the next batched write, keyed by URL
+_pending_upserts = {}
+_pending_lock = threading.Lock()
+_flush_timer = None
+_pending_written = None
+
+# Pages without any Jinja markup, served as raw bytes
+_static_pages = {}
+
+# Cached JSON payloads for the URL list endpoints; version is the shared write
+# counter the payloads were built at, checked by admin reads on every worker
+_urls_cache = {
+    'ts': 0,
+    'version': None,
+    'data': None,
+    'urls': None,
+    'etag': None,
+    'lock': threading.Lock()
+}
 
 
 def connect_to_mongo():
     """Connect to MongoDB and ensure collections exist"""
-    global mongo_client, db, urls_collection
+    with _mongo_lock:
+        # Reuse the process-wide client if it has already been created
+        if urls_collection is not None:
+            return
+        _connect_to_mongo()
+
+
+def _connect_to_mongo():
+    """Create the MongoDB client and select the URL collection"""
+    global mongo_client, db, urls_collection, meta_collection
     
     try:
-        mongo_client = MongoClient(MONGO_URL)
+        mongo_client = MongoClient(MONGO_URL, **MONGO_CLIENT_OPTIONS)
         print('Connected to MongoDB server')
         
         # Get or create the database
@@ -74,6 +170,14 @@ def connect_to_mongo():
                 print(f"Collection '{URL_COLLECTION_NAME}' will be created on first data insertion")
         
         urls_collection = db[URL_COLLECTION_NAME]
+        meta_collection = db[META_COLLECTION_NAME]
+        
+        # Unique index so URL lookups and upserts avoid a collection scan
+        try:
+            urls_collection.create_index([('url', 1)], unique=True)
+        except Exception as index_error:
+            print(f"Could not create unique index on '{URL_COLLECTION_NAME}.url': {index_error}")
+        
         print(f"Successfully connected to MongoDB database '{DB_NAME}'")
         
     except Exception as err:
@@ -81,9 +185,161 @@ def connect_to_mongo():
         raise
 
 
+def get_urls_version() -> int:
+    """Read the URL write counter shared by all server workers"""
+    doc = meta_collection.find_one({'_id': URL_COLLECTION_NAME}, {'version': 1})
+    return doc.get('version', 0) if doc else 0
+
+
+def bump_urls_version():
+    """Advance the shared URL write counter so other workers drop their cached lists"""
+    try:
+        meta_collection.update_one({'_id': URL_COLLECTION_NAME}, {'$inc': {'version': 1}}, upsert=True)
+    except Exception as err:
+        print(f'Error updating URL list version: {err}')
+    invalidate_urls_cache()
+
+
+def get_cached_urls(fresh: bool = False) -> Dict[str, Any]:
+    """Return the serialized URL payloads, refreshing them from MongoDB when stale
+
+    Public reads are served from memory until URLS_CACHE_TTL expires; fresh
+    reads (the admin UI) also pick up writes made through any other worker.
+    """
+    version = None
+    if fresh:
+        # Make queued admin writes visible before reading
+        flush_pending_upserts()
+        version = get_urls_version()
+    
+    with _urls_cache['lock']:
+        now = time.monotonic()
+        if (_urls_cache['data'] is None or now - _urls_cache['ts'] >= URLS_CACHE_TTL
+                or (fresh and _urls_cache['version'] != version)):
+            # Read the counter before the list so a concurrent write is never marked as seen
+            if version is None:
+                version = get_urls_version()
+            cursor = urls_collection.aggregate(URL_DATA_PIPELINE, batchSize=URLS_BATCH_SIZE)
+            
+            # Encode documents as they come off the cursor so only one batch
+            # of decoded documents is held at a time
+            data_chunks = []
+            url_list = []
+            for url in cursor:
+                data_chunks.append(dump_json(url))
+                url_list.append(url['url'])
+            
+            # Build both payloads from one query so each endpoint is served from memory
+            _urls_cache['data'] = b'[' + b','.join(data_chunks) + b']'
+            _urls_cache['urls'] = dump_json(url_list)
+            _urls_cache['etag'] = hashlib.blake2b(_urls_cache['urls'], digest_size=8).hexdigest()
+            _urls_cache['ts'] = now
+            _urls_cache['version'] = version
+        
+        return {
+            'data': _urls_cache['data'],
+            'urls': _urls_cache['urls'],
+            'etag': _urls_cache['etag']
+        }
+
+
+def invalidate_urls_cache():
+    """Drop the cached URL payloads so the next read hits MongoDB"""
+    with _urls_cache['lock']:
+        _urls_cache['data'] = None
+        _urls_cache['urls'] = None
+
+
+def load_static_page(name: str):
+    """Read a template once, returning None if it needs Jinja rendering"""
+    with open(os.path.join(TEMPLATE_DIR, name), 'rb') as f:
+        body = f.read()
+    if b'{{' in body or b'{%' in body:
+        return None
+    return body
+
+
+def serve_page(name: str):
+    """Serve a page from memory when static, otherwise render the template"""
+    if name not in _static_pages:
+        _static_pages[name] = load_static_page(name)
+    
+    body = _static_pages[name]
+    if body is None:
+        return render_template(name)
+    return Response(body, mimetype='text/html', headers={'Cache-Control': 'public, max-age=300'})
+
+
+def build_url_upsert(name, now: datetime) -> Dict[str, Any]:
+    """Build the upsert document for a URL record"""
+    update = {
+        # Let the server stamp updatedAt instead of building it per request
+        '$currentDate': {'updatedAt': True},
+        '$setOnInsert': {'createdAt': now}
+    }
+    # Keep the existing name when an update doesn't provide one
+    if name:
+        update['$set'] = {'name': name}
+    else:
+        update['$setOnInsert']['name'] = name
+    return update
+
+
+def queue_url_upsert(url: str, name) -> Future:
+    """Queue a URL upsert to be written with others in the same batch window"""
+    global _flush_timer, _pending_written
+    
+    with _pending_lock:
+        # Repeated submissions of a URL collapse into one write
+        _pending_upserts[url] = name or _pending_upserts.get(url)
+        
+        if _flush_timer is None:
+            _pending_written = Future()
+            _flush_timer = threading.Timer(UPSERT_BATCH_WINDOW, flush_pending_upserts)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+        # Resolves to the set of newly inserted URLs once this batch is written
+        return _pending_written
+
+
+def flush_pending_upserts():
+    """Write all queued URL upserts in a single bulk operation"""
+    global _flush_timer, _pending_written
+    
+    with _pending_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        pending = list(_pending_upserts.items())
+        _pending_upserts.clear()
+        written, _pending_written = _pending_written, None
+    
+    if not pending:
+        return
+    
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne({'url': url}, build_url_upsert(name, now), upsert=True)
+        for url, name in pending
+    ]
+    
+    try:
+        result = urls_collection.bulk_write(operations, ordered=False)
+        print(f'URL upserts written: {result.upserted_count} added, {result.matched_count} updated')
+    except Exception as err:
+        print(f'Error writing URL upserts: {err}')
+        written.set_exception(err)
+        return
+    
+    bump_urls_version()
+    written.set_result({pending[i][0] for i in result.upserted_ids})
+
+
 def check_auth(username: str, password: str) -> bool:
-    """Check admin credentials"""
-    return username == ADMIN_USER and password == ADMIN_PASS
+    """Check admin credentials in constant time"""
+    # Bitwise & so both fields are always compared
+    return hmac.compare_digest((username or '').encode(), ADMIN_USER.encode()) & \
+        hmac.compare_digest((password or '').encode(), ADMIN_PASS.encode())
 
 
 def authenticate():
@@ -93,54 +349,77 @@ def authenticate():
     }
 
 
-def run_scraper_async():
-    """Run the scraper in a separate thread"""
-    global scraper_status
+@lru_cache(maxsize=64)
+def _auth_ok(username: str, password: str) -> bool:
+    """Memoized credential check for repeated requests from polling clients"""
+    return check_auth(username, password)
+
+
+def require_admin(view):
+    """Require admin basic auth for a route"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        auth = request.authorization
+        if not auth or not _auth_ok(auth.username, auth.password):
+            return authenticate()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def update_scraper_status(**changes):
+    """Apply status changes and rebuild the cached JSON body served to pollers"""
+    global _status_json
     
+    with _status_lock:
+        scraper_status.update(changes)
+        _status_json = orjson.dumps(scraper_status)
+
+
+def run_scraper_async():
+    """Run the scraper on the scraper worker thread"""
     try:
-        scraper_status['running'] = True
-        scraper_status['error'] = None
-        scraper_status['last_status'] = 'Starting scraper...'
+        update_scraper_status(
+            running=True,
+            error=None,
+            last_status='Starting scraper...'
+        )
         
-        # Import and run the scraper
-        from scrape_price import main as scrape_main
-        asyncio.run(scrape_main())
+        run_scrape()
         
-        scraper_status['last_status'] = 'Scraper completed successfully'
-        scraper_status['last_run'] = datetime.now().isoformat()
+        update_scraper_status(
+            last_status='Scraper completed successfully',
+            # orjson formats the datetime when the status body is rebuilt
+            last_run=datetime.now(timezone.utc)
+        )
         
     except Exception as e:
-        scraper_status['error'] = str(e)
-        scraper_status['last_status'] = f'Scraper failed: {str(e)}'
+        update_scraper_status(
+            error=str(e),
+            last_status=f'Scraper failed: {str(e)}'
+        )
         print(f'Scraper error: {e}')
     finally:
-        scraper_status['running'] = False
+        update_scraper_status(running=False)
 
 
 # Routes
 @app.route('/')
 def index():
     """Serve the main landing page"""
-    return render_template('index.html')
+    return serve_page('index.html')
 
 
 @app.route('/admin')
+@require_admin
 def admin():
     """Admin URL manager page"""
-    auth = request.authorization
-    if not auth or not check_auth(auth.username, auth.password):
-        return authenticate()
-    
-    return render_template('url-manager.html')
+    return serve_page('url-manager.html')
 
 
 @app.route('/admin/add-url', methods=['POST'])
+@require_admin
 def add_url():
     """Add or update a URL"""
-    auth = request.authorization
-    if not auth or not check_auth(auth.username, auth.password):
-        return authenticate()
-    
     try:
         data = request.get_json()
         url = data.get('url')
@@ -149,32 +428,11 @@ def add_url():
         if not url:
             return jsonify({'success': False, 'error': 'URL is required'}), 400
         
-        # Check if URL already exists
-        existing_url = urls_collection.find_one({'url': url})
-        
-        if existing_url:
-            # Update existing record
-            urls_collection.update_one(
-                {'url': url},
-                {
-                    '$set': {
-                        'name': name or existing_url.get('name'),
-                        'updatedAt': datetime.now()
-                    }
-                }
-            )
-            print(f'URL updated: {url}')
-            message = 'URL updated'
-        else:
-            # Insert new record
-            urls_collection.insert_one({
-                'url': url,
-                'name': name,
-                'createdAt': datetime.now()
-            })
-            print(f'URL added: {url}')
-            message = 'URL added'
-        
+        # Answer once the batch is written, so a reload served by any worker sees the URL;
+        # a failed write or a timeout raises and is reported as an error
+        added = queue_url_upsert(url, name).result(timeout=UPSERT_WAIT_TIMEOUT)
+        message = 'URL added' if url in added else 'URL updated'
+        print(f'{message}: {url}')
         return jsonify({'success': True, 'message': message})
         
     except Exception as err:
@@ -183,12 +441,9 @@ def add_url():
 
 
 @app.route('/admin/delete-url', methods=['POST'])
+@require_admin
 def delete_url():
     """Delete a URL"""
-    auth = request.authorization
-    if not auth or not check_auth(auth.username, auth.password):
-        return authenticate()
-    
     try:
         data = request.get_json()
         url_id = data.get('id')
@@ -197,6 +452,7 @@ def delete_url():
             return jsonify({'success': False, 'error': 'URL ID is required'}), 400
         
         urls_collection.delete_one({'_id': ObjectId(url_id)})
+        bump_urls_version()
         return redirect(url_for('admin'))
         
     except Exception as err:
@@ -205,18 +461,12 @@ def delete_url():
 
 
 @app.route('/admin/api/urls-data')
+@require_admin
 def get_urls_data():
     """API endpoint to get all URLs with full data (for the frontend)"""
-    auth = request.authorization
-    if not auth or not check_auth(auth.username, auth.password):
-        return authenticate()
-    
     try:
-        urls = list(urls_collection.find({}))
-        # Convert ObjectId to string for JSON serialization
-        for url in urls:
-            url['_id'] = str(url['_id'])
-        return jsonify(urls)
+        cached = get_cached_urls(fresh=True)
+        return Response(cached['data'], mimetype='application/json')
         
     except Exception as err:
         print(f'Error fetching URLs: {err}')
@@ -227,8 +477,17 @@ def get_urls_data():
 def get_urls():
     """API endpoint to get all URLs (for the scraper)"""
     try:
-        urls = list(urls_collection.find({}))
-        return jsonify([url['url'] for url in urls])
+        cached = get_cached_urls()
+        
+        # Let clients skip the body when the URL list hasn't changed
+        if request.if_none_match.contains(cached['etag']):
+            response = Response(status=304)
+        else:
+            response = Response(cached['urls'], mimetype='application/json')
+        
+        response.set_etag(cached['etag'])
+        response.headers['Cache-Control'] = f'max-age={URLS_CACHE_TTL}'
+        return response
         
     except Exception as err:
         print(f'Error fetching URLs: {err}')
@@ -236,59 +495,54 @@ def get_urls():
 
 
 @app.route('/admin/run-scraper', methods=['POST'])
+@require_admin
 def run_scraper():
     """Start the scraper"""
-    auth = request.authorization
-    if not auth or not check_auth(auth.username, auth.password):
-        return authenticate()
-    
-    global scraper_status
-    
-    if scraper_status['running']:
-        return jsonify({'success': False, 'error': 'Scraper is already running'}), 400
+    global _scraper_future
     
-    # Start scraper in a separate thread
-    thread = threading.Thread(target=run_scraper_async)
-    thread.daemon = True
-    thread.start()
+    with _scraper_lock:
+        if _scraper_future is not None and not _scraper_future.done():
+            return jsonify({'success': False, 'error': 'Scraper is already running'}), 400
+        
+        # Hand the run to the scraper worker thread
+        _scraper_future = _scraper_pool.submit(run_scraper_async)
     
     return jsonify({'success': True, 'message': 'Scraper started'})
 
 
 @app.route('/admin/scraper-status')
+@require_admin
 def get_scraper_status():
     """Get current scraper status"""
-    auth = request.authorization
-    if not auth or not check_auth(auth.username, auth.password):
-        return authenticate()
-    
-    return jsonify(scraper_status)
+    return Response(_status_json, mimetype='application/json')
 
 
 @app.route('/admin/screenshot')
+@require_admin
 def view_screenshot():
-    """View the latest screenshot from scraping"""
-    auth = request.authorization
-    if not auth or not check_auth(auth.username, auth.password):
-        return authenticate()
-    
-    import os
+    """View the latest debug screenshot from scraping"""
+    import glob
     from flask import send_from_directory
     
     # Get the project root directory (one level up from app/)
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    screenshot_path = os.path.join(project_root, 'test2.png')
+    screenshots = glob.glob(os.path.join(project_root, 'debug_*.png'))
     
-    if os.path.exists(screenshot_path):
-        return send_from_directory(project_root, 'test2.png')
+    if screenshots:
+        latest = max(screenshots, key=os.path.getmtime)
+        return send_from_directory(project_root, os.path.basename(latest))
     else:
-        return "Screenshot not found. Run the scraper first to generate a screenshot.", 404
+        return "Screenshot not found. Run the scraper with SCRAPE_DEBUG_SCREENSHOT=1 to generate screenshots.", 404
 
 
 def start_server():
-    """Start the Flask server"""
+    """Start the web server (Flask dev server only when FLASK_DEBUG is set)"""
     connect_to_mongo()
-    app.run(host='0.0.0.0', port=PORT, debug=True)
+    if DEBUG:
+        app.run(host='0.0.0.0', port=PORT, debug=True, use_reloader=False)
+    else:
+        print(f'Serving on port {PORT} with {SERVER_THREADS} threads')
+        serve(app, host='0.0.0.0', port=PORT, threads=SERVER_THREADS)
 
 
 if __name__ == '__main__':
@@ -5,27 +5,30 @@ Main entry point for the Python Scrapper application
 
 import sys
 import argparse
-import asyncio
-from app.url_manager import start_server
-from scrape_price import main as scrape_main
-from test_twilio import test_twilio
 from config import Config
 
 
 def run_url_manager():
     """Run the URL manager Flask application"""
+    # Imported per command so unrelated commands skip the heavy imports
+    from app.url_manager import start_server
+    
     print("Starting URL Manager...")
     start_server()
 
 
 def run_scraper():
     """Run the price scraper"""
+    from scrape_price import run as run_scrape
+    
     print("Starting Price Scraper...")
-    asyncio.run(scrape_main())
+    run_scrape()
 
 
 def run_twilio_test():
     """Run Twilio test"""
+    from test_twilio import test_twilio
+    
     print("Testing Twilio...")
     test_twilio()
 
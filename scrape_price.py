@@ -5,18 +5,29 @@ Scrapes product prices from URLs and stores them in MongoDB
 """
 
 import os
-import json
+import re
+import zlib
 import time
 import random
 import asyncio
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import partial
 from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
 
+import aiohttp
+import orjson
 from dotenv import load_dotenv
 from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-from pymongo import MongoClient
-from twilio.rest import Client as TwilioClient
+from selectolax.parser import HTMLParser
+from pymongo import IndexModel, MongoClient, UpdateOne, WriteConcern
+
+try:
+    import uvloop
+except ImportError:
+    # uvloop is POSIX-only; fall back to the default asyncio loop
+    uvloop = None
 
 # Load environment variables
 load_dotenv()
@@ -26,29 +37,217 @@ MONGO_URL = os.getenv('MONGODB_URL', 'mongodb://localhost:27017/')
 DB_NAME = os.getenv('MONGODB_DB_NAME', 'scrapper')
 COLLECTION_NAME = os.getenv('MONGODB_COLLECTION_NAME', 'products')
 
+# Pool sized for concurrent scrape tasks; writes default to unacknowledged
+MONGO_CLIENT_OPTIONS = {
+    'maxPoolSize': 50,
+    'minPoolSize': 5,
+    'compressors': os.getenv('MONGODB_COMPRESSORS', 'zlib'),
+    'w': 0,
+    'retryWrites': False,
+    'serverSelectionTimeoutMS': 3000
+}
+
 # Twilio configuration
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 TWILIO_FROM_NUMBER = os.getenv('TWILIO_FROM_NUMBER')
 TO_NUMBER = '+19206455791'
 
-# Initialize Twilio client if credentials are available
-twilio_client = None
-if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
-    twilio_client = TwilioClient(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# BrightData Browser API configuration, resolved once per process
+_BRIGHTDATA_PLACEHOLDER = 'SBR_ZONE_FULL_USERNAME:SBR_ZONE_PASSWORD'
+_BRIGHTDATA_AUTH = os.getenv('BRIGHTDATA_AUTH')
+_USE_BRIGHTDATA = bool(_BRIGHTDATA_AUTH) and _BRIGHTDATA_AUTH != _BRIGHTDATA_PLACEHOLDER
+_BRIGHTDATA_WS = f'wss://{_BRIGHTDATA_AUTH}@brd.superproxy.io:9222' if _USE_BRIGHTDATA else None
+
+# Number of hosts scraped concurrently, each in its own browser context
+SCRAPE_CONCURRENCY = int(os.getenv('SCRAPE_CONCURRENCY', 6))
+# Minimum seconds between navigations to the same host; different hosts don't wait on each other
+MIN_HOST_GAP = float(os.getenv('SCRAPE_MIN_HOST_GAP', 2.0))
+SCRAPE_DEBUG_SCREENSHOT = os.getenv('SCRAPE_DEBUG_SCREENSHOT', '').lower() in ('1', 'true', 'yes')
+
+# Queued product writes are flushed in bulk once this many accumulate
+BULK_WRITE_SIZE = 100
+
+# Browser context options with realistic headers
+CONTEXT_OPTIONS = {
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'viewport': {'width': 1920, 'height': 1080},
+    'extra_http_headers': {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Cache-Control': 'no-cache',
+        'Pragma': 'no-cache',
+        'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+        'Sec-Ch-Ua-Mobile': '?0',
+        'Sec-Ch-Ua-Platform': '"Windows"',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Sec-Fetch-User': '?1',
+        'Upgrade-Insecure-Requests': '1',
+        'Connection': 'keep-alive',
+        'DNT': '1'
+    },
+    'locale': 'en-US',
+    'timezone_id': 'America/New_York'
+}
+
+# Local Chromium flags; the user agent comes from CONTEXT_OPTIONS
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-gpu',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-extensions',
+    '--no-first-run',
+    '--mute-audio'
+]
+
+# Elements the HTML fallback reads a price from
+PRICE_SELECTOR = 'span.price, div.price, span[data-testid="price"]'
+
+# Fallback price parsing: drop currency symbols and thousands separators in one pass.
+# Spaces are also dropped for the bare-number float() attempt, but kept as separators
+# when the number has to be searched for
+_PRICE_TRANS = str.maketrans('', '', '$,€£')
+_PRICE_SPACES = str.maketrans('', '', '\xa0 ')
+_PRICE_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# Resource types and analytics/ads/tracking hosts blocked during page loads
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font', 'stylesheet'})
+BLOCKED_HOSTS = frozenset({
+    'doubleclick.net', 'googletagmanager.com', 'google-analytics.com',
+    'facebook.net', 'amazon-adsystem.com', 'adservice.google.com',
+    'snap.licdn.com', 'bat.bing.com'
+})
+
+
+# Per-retailer element that marks the product page as rendered: domain -> (selector, timeout ms)
+WAIT_STRATEGIES = {
+    'walmart.com': ('#itemDetailPage', 4000),
+    'amazon.com': ('#productTitle', 4000)
+}
+
+
+def iter_domains(hostname: Optional[str]):
+    """Yield a hostname followed by each of its parent domains"""
+    if not hostname:
+        return
+    labels = hostname.split('.')
+    for i in range(len(labels) - 1):
+        yield '.'.join(labels[i:])
+
+
+def is_blocked_host(hostname: Optional[str]) -> bool:
+    """Check a hostname and each of its parent domains against BLOCKED_HOSTS"""
+    return any(domain in BLOCKED_HOSTS for domain in iter_domains(hostname))
+
+
+def get_wait_strategy(url: str):
+    """Find the render-wait selector for a URL's retailer, if one is known"""
+    for domain in iter_domains(urlsplit(url).hostname):
+        if domain in WAIT_STRATEGIES:
+            return WAIT_STRATEGIES[domain]
+    return None
+
+
+# Twilio client, created on the first SMS rather than at import
+_twilio_client = None
+
+
+def get_twilio_client():
+    """Return the Twilio client if SMS is configured, creating it on first use"""
+    global _twilio_client
+    if _twilio_client is None and TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_FROM_NUMBER:
+        from twilio.rest import Client as TwilioClient
+        _twilio_client = TwilioClient(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return _twilio_client
+
+
+def parse_price(price_text: str) -> Optional[float]:
+    """Parse a displayed price such as '$1,234.50' into a float
+
+    >>> parse_price('$1,234.50')
+    1234.5
+    >>> parse_price('$12.99 $15.99')
+    12.99
+    >>> parse_price('Qty 1 $12.99')
+    1.0
+    """
+    cleaned = price_text.translate(_PRICE_TRANS)
+    # Only plain digits take the fast path; float() alone would accept 'nan', '-5', '1e3', '1_000'
+    compact = cleaned.translate(_PRICE_SPACES)
+    if compact.replace('.', '', 1).isdecimal():
+        return float(compact)
+    price_match = _PRICE_RE.search(cleaned)
+    return float(price_match.group()) if price_match else None
+
+
+def to_price(value) -> Optional[float]:
+    """Coerce a JSON-LD or stored price (number or string) to a float"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        return parse_price(value)
+    return None
+
+
+def get_validators(response) -> Dict[str, str]:
+    """Pull the HTTP cache validators from a page navigation response"""
+    if response is None:
+        return {}
+    
+    validators = {}
+    etag = response.headers.get('etag')
+    last_modified = response.headers.get('last-modified')
+    if etag:
+        validators['etag'] = etag
+    if last_modified:
+        validators['last_modified'] = last_modified
+    return validators
+
+
+def build_product_update(fields: Dict[str, Any], stamp: Optional[str], now: datetime) -> Dict[str, Any]:
+    """Build a product update; stamp is 'created', 'updated' or None for a plain field update"""
+    update = {'$set': dict(fields)}
+    if stamp:
+        update['$setOnInsert'] = {'createdAt': now}
+    if stamp == 'updated':
+        update['$set']['updatedAt'] = now
+    return update
 
 
 class PriceScraper:
+    # MongoClient shared by every PriceScraper in the process
+    _shared_mongo_client = None
+
+    @classmethod
+    def get_mongo_client(cls):
+        """Return the process-wide MongoClient, creating it on first use"""
+        if cls._shared_mongo_client is None:
+            cls._shared_mongo_client = MongoClient(MONGO_URL, **MONGO_CLIENT_OPTIONS)
+        return cls._shared_mongo_client
+
     def __init__(self):
         self.mongo_client = None
         self.db = None
         self.products_collection = None
+        self.products_bulk = None
         self.urls_collection = None
+        self._ops = []
+        self._price_cache = {}
+        self._validators = {}
+        self._http = None
+        self._host_gate = defaultdict(lambda: (asyncio.Lock(), [0.0]))
 
     async def ensure_database_and_collection(self):
         """Ensure database and collections exist"""
         try:
-            self.mongo_client = MongoClient(MONGO_URL)
+            self.mongo_client = self.get_mongo_client()
             self.db = self.mongo_client[DB_NAME]
             
             # Test the database connection and ensure collections exist
@@ -74,8 +273,14 @@ class PriceScraper:
                 except Exception:
                     print("Collection 'urls' will be created on first data insertion")
             
-            self.products_collection = self.db[COLLECTION_NAME]
+            # Acknowledged handle for writes that must land before an SMS goes out
+            self.products_collection = self.db.get_collection(
+                COLLECTION_NAME, write_concern=WriteConcern(w=1)
+            )
+            # Bulk price writes use the client's unacknowledged default
+            self.products_bulk = self.db[COLLECTION_NAME]
             self.urls_collection = self.db['urls']
+            self.ensure_product_indexes()
             
             print(f"Successfully connected to MongoDB database '{DB_NAME}'")
             
@@ -83,132 +288,120 @@ class PriceScraper:
             print(f"Failed to connect to MongoDB: {err}")
             raise
 
+    def ensure_product_indexes(self):
+        """Uniquely index url, the key every product upsert in store_in_mongo uses"""
+        try:
+            self.products_collection.create_indexes([
+                IndexModel([('url', 1)], unique=True)
+            ])
+        except Exception as index_error:
+            print(f"Could not create product indexes: {index_error}")
+
     def get_urls_from_manager(self) -> list:
         """Get URLs from the URL manager collection"""
         try:
-            urls = list(self.urls_collection.find({}))
-            return [url['url'] for url in urls]
+            cursor = self.urls_collection.find({}, {'url': 1, '_id': 0}).batch_size(500)
+            return [url['url'] for url in cursor]
         except Exception as error:
             print(f"Error fetching URLs from manager: {error}")
             return []
 
-    async def fetch_price(self, url: str, max_retries: int = 2):
-        """Fetch price from a single URL with retry logic"""
+    async def launch_local_browser(self, playwright):
+        """Launch a local headless Chromium"""
+        return await playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+
+    async def launch_browser(self, playwright):
+        """Launch the browser shared by every URL in a scrape run"""
+        # Validate BrightData credentials if provided
+        if _BRIGHTDATA_AUTH == _BRIGHTDATA_PLACEHOLDER:
+            print("Warning: BrightData credentials not properly configured!")
+            print("Please set BRIGHTDATA_AUTH environment variable with your actual credentials")
+            print("Format: BRIGHTDATA_AUTH=your-username:your-password")
+        
+        if _USE_BRIGHTDATA:
+            try:
+                print(f"Using BrightData Browser API with auth: {_BRIGHTDATA_AUTH[:20]}...")
+                # Use BrightData Browser API via CDP connection
+                browser = await playwright.chromium.connect_over_cdp(_BRIGHTDATA_WS)
+                print("Connected to BrightData Browser API!")
+            except Exception as cdp_error:
+                print(f"Failed to connect to BrightData Browser API: {cdp_error}")
+                print("Falling back to local browser...")
+                # Fall back to local browser
+                browser = await self.launch_local_browser(playwright)
+        else:
+            print("Using local browser (no BrightData)")
+            # Use local browser
+            browser = await self.launch_local_browser(playwright)
+        
+        return browser
+
+    def get_http_session(self) -> aiohttp.ClientSession:
+        """Return the pooled HTTP session for non-browser requests, creating it on first use"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=64, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._http
+
+    async def close_http_session(self):
+        """Close the pooled HTTP session if one was opened"""
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def is_not_modified(self, url: str) -> bool:
+        """Send a conditional HEAD with the stored validators and report a 304"""
+        # With BrightData configured an aiohttp HEAD would bypass the proxy, so skip it
+        validators = self._validators.get(url)
+        if not validators or _USE_BRIGHTDATA:
+            return False
+        
+        headers = {'User-Agent': CONTEXT_OPTIONS['user_agent']}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        
+        # The HEAD counts against the host's spacing like any navigation
+        await self._wait_for_host(url)
+        try:
+            async with self.get_http_session().head(url, headers=headers, allow_redirects=True) as response:
+                return response.status == 304
+        except Exception as err:
+            print(f"Conditional request failed for {url}: {err}")
+            return False
+
+    async def fetch_price(self, context, url: str, max_retries: int = 2):
+        """Fetch price from a single URL in its host's context, with retry logic"""
+        # Skip the browser entirely when the server reports the page unchanged
+        if await self.is_not_modified(url):
+            print(f"Page not modified since last scrape, skipping: {url}")
+            return
+        
         for attempt in range(max_retries):
-            playwright = None
-            browser = None
-            context = None
             page = None
+            response = None
             
             try:
                 print(f"Attempt {attempt + 1}/{max_retries} for URL: {url}")
                 
-                # Initialize playwright
-                playwright = await async_playwright().start()
-                
-                # Enhanced context options with better headers
-                context_options = {
-                    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'viewport': {'width': 1920, 'height': 1080},
-                    'extra_http_headers': {
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                        'Accept-Language': 'en-US,en;q=0.9',
-                        'Accept-Encoding': 'gzip, deflate, br',
-                        'Cache-Control': 'no-cache',
-                        'Pragma': 'no-cache',
-                        'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                        'Sec-Ch-Ua-Mobile': '?0',
-                        'Sec-Ch-Ua-Platform': '"Windows"',
-                        'Sec-Fetch-Dest': 'document',
-                        'Sec-Fetch-Mode': 'navigate',
-                        'Sec-Fetch-Site': 'none',
-                        'Sec-Fetch-User': '?1',
-                        'Upgrade-Insecure-Requests': '1',
-                        'Connection': 'keep-alive',
-                        'DNT': '1'
-                    },
-                    'locale': 'en-US',
-                    'timezone_id': 'America/New_York'
-                }
-                
-                # Check for BrightData Browser API credentials
-                brightdata_auth = os.getenv('BRIGHTDATA_AUTH')
-                use_brightdata = brightdata_auth and brightdata_auth != 'SBR_ZONE_FULL_USERNAME:SBR_ZONE_PASSWORD'
-                
-                # Validate BrightData credentials if provided
-                if brightdata_auth and brightdata_auth == 'SBR_ZONE_FULL_USERNAME:SBR_ZONE_PASSWORD':
-                    print("Warning: BrightData credentials not properly configured!")
-                    print("Please set BRIGHTDATA_AUTH environment variable with your actual credentials")
-                    print("Format: BRIGHTDATA_AUTH=your-username:your-password")
-                    use_brightdata = False
-                
-                if use_brightdata:
-                    try:
-                        print(f"Using BrightData Browser API with auth: {brightdata_auth[:20]}...")
-                        # Use BrightData Browser API via CDP connection
-                        endpoint_url = f'wss://{brightdata_auth}@brd.superproxy.io:9222'
-                        browser = await playwright.chromium.connect_over_cdp(endpoint_url)
-                        print("Connected to BrightData Browser API!")
-                    except Exception as cdp_error:
-                        print(f"Failed to connect to BrightData Browser API: {cdp_error}")
-                        print("Falling back to local browser...")
-                        use_brightdata = False
-                        # Fall back to local browser
-                        browser = await playwright.chromium.launch(
-                            headless=False,
-                            args=[
-                                '--no-sandbox',
-                                '--disable-dev-shm-usage',
-                                '--disable-blink-features=AutomationControlled',
-                                '--disable-features=VizDisplayCompositor',
-                                '--disable-extensions',
-                                '--disable-plugins',
-                                '--disable-images',
-                                '--disable-web-security',
-                                '--disable-features=IsolateOrigins,site-per-process',
-                                '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                            ]
-                        )
-                else:
-                    print("Using local browser (no BrightData)")
-                    # Use local browser
-                    browser = await playwright.chromium.launch(
-                        headless=False,  # Use headless for better performance and less detection
-                        args=[
-                            '--no-sandbox',
-                            '--disable-dev-shm-usage',
-                            '--disable-blink-features=AutomationControlled',
-                            '--disable-features=VizDisplayCompositor',
-                            '--disable-extensions',
-                            '--disable-plugins',
-                            '--disable-images',  # Speed up loading
-                            # '--disable-javascript',  # Commented out - some sites need JS for content
-                            '--disable-web-security',
-                            '--disable-features=IsolateOrigins,site-per-process',
-                            '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                        ]
-                    )
-
-                context = await browser.new_context(**context_options)
-                
-                # Apply network optimizations early
-                # await self.apply_network_optimizations(context)
-
                 page = await context.new_page()
 
                 # Navigate to the page with enhanced retry logic
                 try:
                     print(f"Navigating to: {url}")
                     
-                    # Add a small delay before navigation to avoid rapid requests
-                    await asyncio.sleep(random.uniform(1, 3))
+                    # Space out navigations to the same host
+                    await self._wait_for_host(url)
                     
                     # Try different navigation strategies
                     navigation_success = False
                     
                     # Strategy 1: Try with domcontentloaded
                     try:
-                        await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+                        response = await page.goto(url, wait_until='domcontentloaded', timeout=60000)
                         navigation_success = True
                         print("Page loaded successfully with domcontentloaded")
                     except Exception as e1:
@@ -216,7 +409,7 @@ class PriceScraper:
                         
                         # Strategy 2: Try with networkidle (more conservative)
                         try:
-                            await page.goto(url, wait_until='networkidle', timeout=60000)
+                            response = await page.goto(url, wait_until='networkidle', timeout=60000)
                             navigation_success = True
                             print("Page loaded successfully with networkidle")
                         except Exception as e2:
@@ -224,7 +417,7 @@ class PriceScraper:
                             
                             # Strategy 3: Try with load event (most basic)
                             try:
-                                await page.goto(url, wait_until='load', timeout=60000)
+                                response = await page.goto(url, wait_until='load', timeout=60000)
                                 navigation_success = True
                                 print("Page loaded successfully with load")
                             except Exception as e3:
@@ -237,7 +430,7 @@ class PriceScraper:
                 except Exception as nav_error:
                     print(f"Navigation error on attempt {attempt + 1}: {nav_error}")
                     if attempt < max_retries - 1:
-                        await self._cleanup_browser(playwright, browser, context, page)
+                        await self._close_page(page)
                         # Use exponential backoff with jitter
                         wait_time = (2 ** attempt) + random.uniform(1, 3)
                         print(f"Retrying in {wait_time:.1f} seconds...")
@@ -247,36 +440,43 @@ class PriceScraper:
                         raise nav_error
 
 
-                try:
-                    await page.wait_for_selector('#itemDetailPage', timeout=4000)
-                except Exception:
-                    await page.wait_for_timeout(1500)
+                # Only wait for a render marker on retailers we know one for;
+                # elsewhere the JSON-LD is usually present at domcontentloaded
+                strategy = get_wait_strategy(url)
+                if strategy:
+                    selector, timeout = strategy
+                    try:
+                        await page.wait_for_selector(selector, timeout=timeout)
+                    except Exception:
+                        await page.wait_for_timeout(1500)
 
                 print("DOM content loaded")
 
-                # Take screenshot
-                await page.screenshot(path='test2.png')
-                print("Screenshot taken")
-
-                # Get the page content
-                content = await page.content()
-                soup = BeautifulSoup(content, 'html.parser')
+                # Debug screenshots are opt-in, named per URL so concurrent pages don't clobber each other
+                if SCRAPE_DEBUG_SCREENSHOT:
+                    await page.screenshot(path=f'debug_{zlib.crc32(url.encode()):08x}.png', full_page=False)
 
-                # Find the <script type="application/ld+json"> tag
-                ld_json_script = soup.find('script', type='application/ld+json')
+                # Read the <script type="application/ld+json"> tag in the browser
+                # instead of pulling the whole DOM over CDP
+                try:
+                    ld_json_text = await page.eval_on_selector(
+                        'script[type="application/ld+json"]', 'el => el.textContent'
+                    )
+                except Exception:
+                    ld_json_text = None
                 
-                if ld_json_script:
+                if ld_json_text:
                     try:
-                        json_data = json.loads(ld_json_script.string)
+                        json_data = orjson.loads(ld_json_text)
                         
                         # Extract price from JSON-LD
                         price = None
                         if 'offers' in json_data:
                             offers = json_data['offers']
                             if isinstance(offers, list) and len(offers) > 0:
-                                price = offers[0].get('price')
+                                price = to_price(offers[0].get('price'))
                             elif isinstance(offers, dict):
-                                price = offers.get('price')
+                                price = to_price(offers.get('price'))
                         
                         # Extract SKU
                         sku = json_data.get('sku')
@@ -284,35 +484,32 @@ class PriceScraper:
                         if price:
                             print(f"Product Price for {url}: {price}")
                             # Store in MongoDB
-                            await self.store_in_mongo({'url': url, 'sku': sku, 'price': price})
-                            await self._cleanup_browser(playwright, browser, context, page)
+                            await self.store_in_mongo({'url': url, 'sku': sku, 'price': price, **get_validators(response)})
+                            await self._close_page(page)
                             return  # Success, exit retry loop
                         else:
                             print(f"Price not found in JSON for {url}.")
                             
-                    except json.JSONDecodeError as json_err:
+                    except orjson.JSONDecodeError as json_err:
                         print(f"Error parsing JSON from ld+json for {url}: {json_err}")
                 else:
                     print(f"No <script type=\"application/ld+json\"> tag found for {url}.")
                 
                 # Fallback: Try to find price in HTML elements
-                price_element = soup.find('span', class_='price') or soup.find('div', class_='price') or soup.find('span', {'data-testid': 'price'})
+                tree = HTMLParser(await page.content())
+                price_element = tree.css_first(PRICE_SELECTOR)
                 if price_element:
-                    price_text = price_element.get_text(strip=True)
-                    # Extract numeric price
-                    import re
-                    price_match = re.search(r'[\d,]+\.?\d*', price_text.replace('$', '').replace(',', ''))
-                    if price_match:
-                        price = float(price_match.group())
+                    price = parse_price(price_element.text(strip=True))
+                    if price is not None:
                         print(f"Product Price for {url} (fallback): {price}")
-                        await self.store_in_mongo({'url': url, 'sku': None, 'price': price})
-                        await self._cleanup_browser(playwright, browser, context, page)
+                        await self.store_in_mongo({'url': url, 'sku': None, 'price': price, **get_validators(response)})
+                        await self._close_page(page)
                         return
                 
                 # If we reach here, the page loaded but no price was found
                 # This is not a network error, so don't retry
                 print(f"Could not extract price from {url}")
-                await self._cleanup_browser(playwright, browser, context, page)
+                await self._close_page(page)
                 return
 
             except Exception as error:
@@ -332,7 +529,7 @@ class PriceScraper:
                 elif "net::ERR_" in error_msg:
                     print("  -> Network error detected - may be proxy-related")
                 
-                await self._cleanup_browser(playwright, browser, context, page)
+                await self._close_page(page)
                 if attempt < max_retries - 1:
                     # Wait before retrying with exponential backoff and jitter
                     wait_time = (2 ** attempt) + random.uniform(2, 8)
@@ -343,13 +540,52 @@ class PriceScraper:
                     # Log the failed URL for manual inspection
                     print(f"Consider checking this URL manually: {url}")
 
-    async def _cleanup_browser(self, playwright, browser, context, page):
-        """Clean up browser resources"""
+    async def _scrape_host(self, semaphore, browser, host: str, jobs: list, total: int):
+        """Scrape one host's URLs in turn, reusing a single context for all of them"""
+        async with semaphore:
+            context = None
+            try:
+                context = await browser.new_context(**CONTEXT_OPTIONS)
+                
+                # Apply network optimizations before the first navigation
+                await self.apply_network_optimizations(context)
+                
+                for index, url in jobs:
+                    print(f'\nScraping {index+1}/{total}: {url}')
+                    await self.fetch_price(context, url)
+            except Exception as e:
+                print(f"Error scraping host {host}: {e}")
+            finally:
+                await self._cleanup_context(context)
+
+    async def _wait_for_host(self, url: str):
+        """Wait until at least MIN_HOST_GAP seconds have passed since the last navigation to url's host"""
+        lock, last = self._host_gate[urlsplit(url).hostname]
+        async with lock:
+            elapsed = time.monotonic() - last[0]
+            if elapsed < MIN_HOST_GAP:
+                await asyncio.sleep(MIN_HOST_GAP - elapsed)
+            last[0] = time.monotonic()
+
+    async def _close_page(self, page):
+        """Close a page, leaving its host context open for the next URL"""
         try:
             if page:
                 await page.close()
+        except Exception as e:
+            print(f"Error during cleanup: {e}")
+
+    async def _cleanup_context(self, context):
+        """Clean up a host context once its URLs are done"""
+        try:
             if context:
                 await context.close()
+        except Exception as e:
+            print(f"Error during cleanup: {e}")
+
+    async def _cleanup_browser(self, playwright, browser):
+        """Clean up the shared browser once the run is over"""
+        try:
             if browser:
                 await browser.close()
             if playwright:
@@ -360,43 +596,104 @@ class PriceScraper:
     async def store_in_mongo(self, product: Dict[str, Any]):
         """Store or update product data in MongoDB"""
         try:
-            # Use SKU if available, otherwise use URL as unique identifier
-            query = {'sku': product['sku']} if product['sku'] else {'url': product['url']}
-            existing = self.products_collection.find_one(query)
+            # URL is always present and unique, so products are keyed on it
+            url = product['url']
+            query = {'url': url}
+            existing = url in self._price_cache
+            old_price = self._price_cache.get(url)
             
-            if existing:
-                if existing['price'] != product['price']:
-                    self.products_collection.update_one(
-                        query,
-                        {'$set': {'price': product['price'], 'updatedAt': datetime.now()}}
-                    )
-                    print('Product price updated in MongoDB:', product)
-
-                    # Send SMS notification if price decreased and Twilio is configured
-                    if existing['price'] > product['price'] and twilio_client and TWILIO_FROM_NUMBER:
-                        try:
-                            message = twilio_client.messages.create(
-                                body=f"Price changed for product (SKU: {product['sku'] or 'N/A'}): {existing['price']} -> {product['price']}\nURL: {product['url']}",
-                                from_=TWILIO_FROM_NUMBER,
-                                to=TO_NUMBER
-                            )
-                            print('SMS notification sent.')
-                        except Exception as sms_err:
-                            print(f'Failed to send SMS notification: {sms_err}')
-                else:
-                    print('Product price unchanged. No update needed.')
-            else:
-                product['createdAt'] = datetime.now()
-                self.products_collection.insert_one(product)
-                print('Product stored in MongoDB:', product)
+            # Cache validators are kept so the next run can send a conditional request
+            validators = {k: product[k] for k in ('etag', 'last_modified') if product.get(k)}
+            validators_changed = validators and validators != self._validators.get(product['url'])
+            if validators:
+                self._validators[product['url']] = validators
+            
+            if existing and old_price == product['price']:
+                if validators_changed:
+                    self._queue_write(query, validators, None)
+                print('Product price unchanged. No update needed.')
+                return
+            
+            fields = {'url': url, 'price': product['price'], **validators}
+            # The HTML fallback has no SKU; don't let it wipe one stored from JSON-LD
+            if product['sku']:
+                fields['sku'] = product['sku']
+            stamp = 'updated' if existing else 'created'
+            
+            # Price drops trigger an SMS, so write them acknowledged before notifying
+            twilio_client = get_twilio_client() if old_price is not None and old_price > product['price'] else None
+            if twilio_client:
+                update = build_product_update(fields, stamp, datetime.now(timezone.utc))
+                self.products_collection.update_one(query, update, upsert=True)
+                self._price_cache[url] = product['price']
+                print('Product price updated in MongoDB:', product)
+                
+                try:
+                    # The Twilio client is blocking, so keep it off the event loop
+                    await asyncio.get_running_loop().run_in_executor(None, partial(
+                        twilio_client.messages.create,
+                        body=f"Price changed for product (SKU: {product['sku'] or 'N/A'}): {old_price} -> {product['price']}\nURL: {product['url']}",
+                        from_=TWILIO_FROM_NUMBER,
+                        to=TO_NUMBER
+                    ))
+                    print('SMS notification sent.')
+                except Exception as sms_err:
+                    print(f'Failed to send SMS notification: {sms_err}')
+                return
+            
+            self._queue_write(query, fields, stamp)
+            self._price_cache[url] = product['price']
+            print('Product queued for MongoDB:', product)
 
         except Exception as err:
             print(f'Error storing product in MongoDB: {err}')
 
+    def load_price_cache(self):
+        """Prefetch stored prices and cache validators, both keyed by URL"""
+        try:
+            projection = {'sku': 1, 'url': 1, 'price': 1, 'etag': 1, 'last_modified': 1, '_id': 0}
+            self._price_cache = {}
+            self._validators = {}
+            for doc in self.products_collection.find({}, projection).batch_size(500):
+                # Older documents may hold the raw JSON-LD string
+                self._price_cache[doc['url']] = to_price(doc.get('price'))
+                validators = {k: doc[k] for k in ('etag', 'last_modified') if doc.get(k)}
+                if validators:
+                    self._validators[doc['url']] = validators
+        except Exception as err:
+            print(f'Error loading stored prices: {err}')
+            self._price_cache = {}
+            self._validators = {}
+
+    def _queue_write(self, query: Dict[str, Any], fields: Dict[str, Any], stamp: Optional[str]):
+        """Queue a product write, flushing once BULK_WRITE_SIZE writes are pending"""
+        self._ops.append((query, fields, stamp))
+        if len(self._ops) >= BULK_WRITE_SIZE:
+            self.flush_writes()
+
+    def flush_writes(self):
+        """Send queued product writes to MongoDB in one unacknowledged bulk write"""
+        if not self._ops:
+            return
+        
+        pending, self._ops = self._ops, []
+        # One timestamp for the whole batch
+        now = datetime.now(timezone.utc)
+        ops = [
+            UpdateOne(query, build_product_update(fields, stamp, now), upsert=stamp is not None)
+            for query, fields, stamp in pending
+        ]
+        try:
+            self.products_bulk.bulk_write(ops, ordered=False)
+            print(f'Flushed {len(ops)} product writes to MongoDB')
+        except Exception as err:
+            print(f'Error writing products to MongoDB: {err}')
+
     async def scrape_all_products(self):
         """Scrape all products from the URL manager"""
         # Ensure database and collections exist before starting
         await self.ensure_database_and_collection()
+        self.load_price_cache()
 
         urls = self.get_urls_from_manager()
         if not urls:
@@ -405,24 +702,32 @@ class PriceScraper:
 
         print(f'Starting to scrape {len(urls)} products...')
         
+        # Group URLs by host so each host's pages share one context
+        by_host = defaultdict(list)
         for i, url in enumerate(urls):
-            print(f'\nScraping {i+1}/{len(urls)}: {url}')
-            await self.fetch_price(url)
+            by_host[urlsplit(url).hostname].append((i, url))
+        
+        # One browser for the whole run; each host gets its own context
+        playwright = await async_playwright().start()
+        browser = None
+        try:
+            browser = await self.launch_browser(playwright)
             
-            # Add progressive delay between requests to avoid rate limiting
-            if i < len(urls) - 1:  # Don't delay after the last URL
-                # Base delay increases with more URLs processed
-                base_delay = 3  # Start at 10s, increase by 2s each URL
-                random_delay = random.uniform(5, 15)  # Add 5-15s random component
-                total_delay = base_delay + random_delay
-                
-                print(f'Waiting {total_delay:.1f} seconds before next request...')
-                await asyncio.sleep(total_delay)
+            # Bound how many contexts are open at once
+            semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+            await asyncio.gather(*(
+                self._scrape_host(semaphore, browser, host, jobs, len(urls))
+                for host, jobs in by_host.items()
+            ))
+        finally:
+            await self._cleanup_browser(playwright, browser)
+            await self.close_http_session()
+            self.flush_writes()
         
         print('\nFinished scraping all products.')
 
 
-    async def apply_network_optimizations(context):
+    async def apply_network_optimizations(self, context):
         """Block non-essential resources to speed up page loads."""
         try:
             # Reduce default timeouts to fail fast on missing elements
@@ -431,20 +736,13 @@ class PriceScraper:
             async def route_handler(route):
                 try:
                     request = route.request
-                    resource_type = request.resource_type
-                    url = request.url
 
                     # Block heavy or non-essential assets
-                    if resource_type in {"image", "media", "font", "stylesheet"}:
+                    if request.resource_type in BLOCKED_RESOURCE_TYPES:
                         return await route.abort()
 
-                    # Block common analytics/ads/tracking
-                    block_hosts = [
-                        'doubleclick.net', 'googletagmanager.com', 'google-analytics.com',
-                        'facebook.net', 'adsystem.com', 'adservice.google.com',
-                        'snap.licdn.com', 'bat.bing.com'
-                    ]
-                    if any(host in url for host in block_hosts):
+                    # Block common analytics/ads/tracking, scripts included
+                    if is_blocked_host(urlsplit(request.url).hostname):
                         return await route.abort()
 
                     return await route.continue_()
@@ -460,9 +758,12 @@ class PriceScraper:
             pass
 
     def close(self):
-        """Close MongoDB connection"""
-        if self.mongo_client:
-            self.mongo_client.close()
+        """Release this scraper's MongoDB handles; the shared client stays pooled"""
+        self.mongo_client = None
+        self.db = None
+        self.products_collection = None
+        self.products_bulk = None
+        self.urls_collection = None
 
 
 async def main():
@@ -474,5 +775,13 @@ async def main():
         scraper.close()
 
 
+def run():
+    """Run the scraper to completion, on uvloop when it is available"""
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
+
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    run()